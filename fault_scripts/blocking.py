@@ -14,6 +14,9 @@ username = os.getenv("DB_USER")
 password = os.getenv("DB_PASSWORD")
 
 canary = Path("DONE")
+# Seconds to hold the row lock at most, and to wait between checks for the canary
+timeout = 500
+poll_interval = 0.05
 
 parser = ArgumentParser()
 parser.add_argument("--wait", action="store_true")
@@ -31,7 +34,6 @@ with oracledb.connect(user=username, password=password, dsn=dsn) as conn:
             new_desc=args.description,
         )
         if args.wait:
-            count = 0
-            while not canary.exists() and count < 500:
-                time.sleep(1)
-                count += 1
+            deadline = time.monotonic() + timeout
+            while not canary.exists() and time.monotonic() < deadline:
+                time.sleep(poll_interval)
@@ -2,6 +2,7 @@ import oracledb
 import os
 
 from argparse import ArgumentParser
+from itertools import batched
 from dotenv import load_dotenv
 
 
@@ -15,6 +16,7 @@ password = os.getenv("DB_PASSWORD")
 parser = ArgumentParser()
 parser.add_argument("--no-create", action="store_false", dest="create", default=True)
 parser.add_argument("--range", type=int, default=10_000)
+parser.add_argument("--batch-size", type=int, default=1_000)
 args = parser.parse_args()
 
 with oracledb.connect(user=username, password=password, dsn=dsn) as conn:
@@ -32,13 +34,17 @@ with oracledb.connect(user=username, password=password, dsn=dsn) as conn:
         cursor.execute("SELECT MAX(id) FROM test_table")
         last_id = cursor.fetchone()[0]
 
-        cursor.executemany(
-            """
-            INSERT INTO test_table (id, description) VALUES (:row_id, :row_value);
-            """,
-            [
-                (last_id + n + 1, f"Initial Value for row {last_id + n + 1}")
-                for n in range(args.range)
-            ],
+        rows = (
+            (row_id, f"Initial Value for row {row_id}")
+            for row_id in range(last_id + 1, last_id + args.range + 1)
         )
+        # Declare the bind types rather than having them inferred from the data
+        cursor.setinputsizes(oracledb.DB_TYPE_NUMBER, 100)
+        for batch in batched(rows, args.batch_size):
+            cursor.executemany(
+                """
+                INSERT INTO test_table (id, description) VALUES (:row_id, :row_value);
+                """,
+                batch,
+            )
         conn.commit()
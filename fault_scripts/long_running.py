@@ -18,15 +18,23 @@ with oracledb.connect(user=username, password=password, dsn=dsn) as conn:
             ALTER TABLE test_table PARALLEL 32;
             """
         )
+        cursor.arraysize = 5000
+        # A moving sum over the last 25001 rows, computed as the difference of
+        # two running sums so that no 25001 row window has to be buffered.
         cursor.execute(
             """
-            SELECT /*+ PARALLEL(test_table, 32) */
+            WITH c AS (
+                SELECT /*+ PARALLEL(test_table, 32) */
+                    id,
+                    SUM(SQRT(id)) OVER (ORDER BY id) AS cs
+                FROM test_table
+            )
+            SELECT
                 id,
-                SUM(SQRT(id)) OVER (
-                    ORDER BY id
-                    ROWS BETWEEN 25000 PRECEDING AND CURRENT ROW
-                ) AS moving_sqrt_sum
-            FROM test_table;
+                cs - NVL(LAG(cs, 25001) OVER (ORDER BY id), 0) AS moving_sqrt_sum
+            FROM c;
             """
         )
-        cursor.fetchall()
+        # The rows are not needed, only the work to produce them
+        while cursor.fetchmany():
+            pass
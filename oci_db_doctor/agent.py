@@ -2,24 +2,43 @@
 Demonstration agent for the adjacent MCP server.
 """
 
+import asyncio
 import httpx
 import os
 import sys
-from typing import Dict, Any, List
+import zlib
+from contextlib import AsyncExitStack
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 from pathlib import Path
 
 from dotenv import load_dotenv
 
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
 from langchain_core.runnables import RunnableConfig
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
 from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.prebuilt import ToolNode
 from oci_openai import OciUserPrincipalAuth
 
 
+load_dotenv()
+
+GENAI_REGION = os.getenv("GENAI_REGION", "eu-frankfurt-1")
+COMPARTMENT_ID = os.getenv("COMPARTMENT_ID")
+
 SYSTEM_PROMPT = """
 You are an expert Oracle database diagnostics assistant.
 You help users analyze and troubleshoot Oracle database performance issues.
@@ -28,6 +47,10 @@ When users ask questions about Oracle performance issues, use the appropriate
 diagnostic tools to gather information, then provide clear, concise analysis
 and don't recommend any actions.
 
+For broad questions about the state of the database, prefer the
+`run_all_diagnostics` tool, which runs all diagnostics at once, over calling
+the individual tools one after another.
+
 Be concise but informative in your responses.
 
 Do not hallucinate.
@@ -39,30 +62,129 @@ Check your answer before replying.
 Make sure that your answer is valid markdown and escapes dollar signs ($) properly.
 """
 
+MCP_SERVER_NAME = "oracle-diagnostics"
+
+# Budget for previous conversation turns sent along with each LLM call
+MAX_HISTORY_TOKENS = 8000
+
+# Checkpoints retained per conversation thread
+MAX_CHECKPOINTS = 10
+
+
+@lru_cache(maxsize=1)
+def _oci_auth() -> OciUserPrincipalAuth:
+    """Load the OCI configuration once for all agents"""
+    return OciUserPrincipalAuth()
+
+
+class CompressedSerializer(SerializerProtocol):
+    """Compress the payloads of another serializer with zlib"""
+
+    def __init__(self, serde: SerializerProtocol | None = None):
+        self.serde = serde or JsonPlusSerializer()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        return f"{type_}+zlib", zlib.compress(data)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith("+zlib"):
+            return self.serde.loads_typed(
+                (type_.removesuffix("+zlib"), zlib.decompress(payload))
+            )
+        return self.serde.loads_typed(data)
+
+
+class BoundedSaver(InMemorySaver):
+    """In-memory checkpointer that stores compressed state
+
+    Only the last `max_checkpoints` checkpoints of each thread are retained,
+    together with their pending writes and the channel values they reference.
+    This bounds the number of checkpoints, not their size: each one still holds
+    the full message state, which the agent node keeps within the history
+    budget by removing older turns.
+
+    Pruning works on the private storage of `InMemorySaver`, which is keyed as
+    `storage[thread_id][checkpoint_ns][checkpoint_id]`,
+    `writes[(thread_id, checkpoint_ns, checkpoint_id)]` and
+    `blobs[(thread_id, checkpoint_ns, channel, version)]`.  This layout holds
+    for the `langgraph-checkpoint` versions allowed in `pyproject.toml`.
+    """
+
+    def __init__(self, max_checkpoints: int = MAX_CHECKPOINTS):
+        if max_checkpoints < 1:
+            raise ValueError("At least one checkpoint has to be retained")
+        super().__init__(serde=CompressedSerializer())
+        self.max_checkpoints = max_checkpoints
+        self._channel_versions: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        self._channel_versions[(thread_id, checkpoint_ns, checkpoint["id"])] = dict(
+            checkpoint["channel_versions"]
+        )
+
+        # Checkpoint IDs are time-ordered, hence the oldest sort first
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in sorted(checkpoints)[: -self.max_checkpoints]:
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            del checkpoints[checkpoint_id]
+            self.writes.pop(key, None)
+            self._channel_versions.pop(key, None)
+
+        referenced = {
+            (channel, version)
+            for (thread, ns, _), versions in self._channel_versions.items()
+            if (thread, ns) == (thread_id, checkpoint_ns)
+            for channel, version in versions.items()
+        }
+        for key in list(self.blobs):
+            thread, ns, channel, version = key
+            if (thread, ns) != (thread_id, checkpoint_ns):
+                continue
+            if (channel, version) not in referenced:
+                del self.blobs[key]
+
+        return next_config
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        for key in [key for key in self._channel_versions if key[0] == thread_id]:
+            del self._channel_versions[key]
+
 
 class OracleDiagnosticsAgent:
     def __init__(self):
-        load_dotenv()
-
-        region = os.getenv("GENAI_REGION", "eu-frankfurt-1")
         base_url = f"https://inference.generativeai.{
-            region
+            GENAI_REGION
         }.oci.oraclecloud.com/20231130/actions/v1"
         server_script = Path(__file__).parent / "server.py"
 
         self.graph = None
+        self.session = None
+        self.tools = None
+        self.llm_with_tools = None
+        self._ready_lock = asyncio.Lock()
+        self._exit_stack = AsyncExitStack()
         self.llm = ChatOpenAI(
             model="openai.gpt-oss-120b",
             api_key="OCI",
             base_url=base_url,
-            http_client=httpx.Client(
-                auth=OciUserPrincipalAuth(),
-                headers={"CompartmentId": os.getenv("COMPARTMENT_ID")},
+            http_async_client=httpx.AsyncClient(
+                auth=_oci_auth(),
+                headers={"CompartmentId": COMPARTMENT_ID},
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=10),
+                timeout=60.0,
             ),
         )
         self.mcp_client = MultiServerMCPClient(
             {
-                "oracle-diagnostics": {
+                MCP_SERVER_NAME: {
                     "command": sys.executable,
                     "args": [str(server_script)],
                     "transport": "stdio",
@@ -70,14 +192,61 @@ class OracleDiagnosticsAgent:
             }
         )
 
-    async def get_graph(self):
-        tools = await self.mcp_client.get_tools()
-        llm_with_tools = self.llm.bind_tools(tools)
+    async def _ensure_ready(self):
+        """Fetch the MCP tools and build the graph once per agent
+
+        The MCP session is kept open until `close` is called, so that all tool
+        calls share one server subprocess.  Hence the agent has to be used from
+        a single, long-lived event loop.
+        """
+        async with self._ready_lock:
+            if self.graph is None:
+                self.session = await self._exit_stack.enter_async_context(
+                    self.mcp_client.session(MCP_SERVER_NAME)
+                )
+                self.tools = await load_mcp_tools(self.session)
+                self.llm_with_tools = self.llm.bind_tools(self.tools)
+                self.graph = self.get_graph()
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """Call an MCP tool directly, bypassing the LLM"""
+        await self._ensure_ready()
+        result = await self.session.call_tool(name, arguments)
+        if result.isError:
+            return "\n".join(c.text for c in result.content if c.type == "text")
+        return result.structuredContent
+
+    async def close(self):
+        """Shut down the MCP session, if one was opened"""
+        await self._exit_stack.aclose()
+        self.graph = None
 
+    def get_graph(self):
         async def agent_node(state: MessagesState):
-            messages = [SystemMessage(SYSTEM_PROMPT)] + state["messages"]
-            response = llm_with_tools.invoke(messages)
-            return {"messages": state["messages"] + [response]}
+            messages = state["messages"]
+            # The current turn is always sent in full, earlier turns only as
+            # far as they fit into the token budget.
+            turn_start = max(
+                n for n, msg in enumerate(messages) if isinstance(msg, HumanMessage)
+            )
+            history = trim_messages(
+                messages[:turn_start],
+                max_tokens=MAX_HISTORY_TOKENS,
+                token_counter=count_tokens_approximately,
+                strategy="last",
+                start_on="human",
+            )
+            # Turns that no longer fit are also dropped from the stored state,
+            # bounding the size of every checkpoint.
+            kept = {msg.id for msg in history}
+            removed = [
+                RemoveMessage(id=msg.id)
+                for msg in messages[:turn_start]
+                if msg.id not in kept
+            ]
+            messages = [SystemMessage(SYSTEM_PROMPT)] + history + messages[turn_start:]
+            response = await self.llm_with_tools.ainvoke(messages)
+            return {"messages": removed + [response]}
 
         def should_continue(state: MessagesState) -> str:
             messages = state["messages"]
@@ -91,7 +260,7 @@ class OracleDiagnosticsAgent:
 
         workflow = StateGraph(MessagesState)
         workflow.add_node("agent", agent_node)
-        workflow.add_node("tools", ToolNode(tools))
+        workflow.add_node("tools", ToolNode(self.tools))
         workflow.add_edge(START, "agent")
         workflow.add_conditional_edges(
             "agent",
@@ -99,13 +268,12 @@ class OracleDiagnosticsAgent:
         )
         workflow.add_edge("tools", "agent")
 
-        checkpointer = InMemorySaver()
+        checkpointer = BoundedSaver()
 
         return workflow.compile(checkpointer=checkpointer)
 
     async def process_query(self, user_query: str) -> Dict[str, Any]:
-        if not self.graph:
-            self.graph = await self.get_graph()
+        await self._ensure_ready()
 
         config: RunnableConfig = {"configurable": {"thread_id": "1"}}
         response = await self.graph.ainvoke(
@@ -122,6 +290,7 @@ class OracleDiagnosticsAgent:
 
         final_response = ""
         tool_results = []
+        tool_args = {}
 
         for msg in msgs[-n:]:
             if isinstance(msg, ToolMessage):
@@ -132,22 +301,27 @@ class OracleDiagnosticsAgent:
                 tool_results.append(
                     {
                         "tool": msg.name,
+                        "args": tool_args.get(msg.tool_call_id, {}),
                         "output": output,
                     }
                 )
             if isinstance(msg, AIMessage):
                 final_response = msg.content
+                for call in msg.tool_calls:
+                    tool_args[call["id"]] = call["args"]
 
         return {"response": final_response, "tool_results": tool_results}
 
 
 if __name__ == "__main__":
     from pprint import pprint
-    import asyncio
 
     agent = OracleDiagnosticsAgent()
 
     async def main():
-        pprint(await agent.process_query("List me all blocking sessions!"))
+        try:
+            pprint(await agent.process_query("List me all blocking sessions!"))
+        finally:
+            await agent.close()
 
     asyncio.run(main())
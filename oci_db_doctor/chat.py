@@ -3,23 +3,56 @@ Streamlit interface to demo the agent.
 """
 
 import asyncio
+import threading
+from datetime import datetime
 import streamlit as st
 from .agent import OracleDiagnosticsAgent
 
 
+@st.cache_resource
+def get_event_loop():
+    """Run one event loop for the lifetime of the app
+
+    The agent keeps its MCP session open between queries, which requires all
+    queries to run on the same loop rather than a new one per `asyncio.run`.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
 @st.cache_resource
 def get_agent():
     return OracleDiagnosticsAgent()
 
 
+loop = get_event_loop()
 agent = get_agent()
 
 
-def display_tool_results(tool_results):
+def rerun_verbose(tool_result):
+    """Call a tool again with verbose output, recording when and any error"""
+    taken_at = datetime.now().strftime("%H:%M:%S")
+    try:
+        output = asyncio.run_coroutine_threadsafe(
+            agent.call_tool(
+                tool_result["tool"],
+                {**tool_result.get("args", {}), "verbose": True},
+            ),
+            loop,
+        ).result()
+    except Exception as e:
+        return {"taken_at": taken_at, "output": None, "error": str(e)}
+    if isinstance(output, str):
+        return {"taken_at": taken_at, "output": None, "error": output}
+    return {"taken_at": taken_at, "output": output, "error": None}
+
+
+def display_tool_results(tool_results, key):
     if not tool_results:
         return
     with st.expander("🔧 Tool Execution Results", expanded=True):
-        for tool_result in tool_results:
+        for n, tool_result in enumerate(tool_results):
             if (
                 isinstance((res := tool_result["output"]), str)
                 and "error" in res.lower()
@@ -34,7 +67,25 @@ def display_tool_results(tool_results):
                     f"✅ {tool_result.get('tool', 'unknown')}",
                     expanded=False,
                 ):
-                    st.json(tool_result["output"])
+                    # Tools only return a summary by default.  All rows are
+                    # fetched once when the toggle is switched on, by calling
+                    # the tool again, and kept until it is switched off.
+                    raw_key = f"raw-{key}-{n}"
+                    if st.toggle("Re-run for all rows", key=f"toggle-{raw_key}"):
+                        if raw_key not in st.session_state:
+                            st.session_state[raw_key] = rerun_verbose(tool_result)
+                        raw = st.session_state[raw_key]
+                        st.caption(
+                            f"Re-run at {raw['taken_at']}, the rows may differ "
+                            "from the summary of this message."
+                        )
+                        if raw["error"]:
+                            st.markdown(f"```\n{raw['error']}\n```")
+                        else:
+                            st.json(raw["output"])
+                    else:
+                        st.session_state.pop(raw_key, None)
+                        st.json(tool_result["output"])
 
 
 def ui():
@@ -48,12 +99,12 @@ def ui():
     chat_container = st.container()
 
     with chat_container:
-        for message in st.session_state.messages:
+        for n, message in enumerate(st.session_state.messages):
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
 
                 if "tool_results" in message:
-                    display_tool_results(message["tool_results"])
+                    display_tool_results(message["tool_results"], key=n)
 
     if prompt := st.chat_input("Ask about database diagnostics..."):
         st.session_state.messages.append({"role": "user", "content": prompt})
@@ -63,7 +114,9 @@ def ui():
                 st.markdown(prompt)
 
         with st.spinner("Processing your query with AI diagnostics agent..."):
-            result = asyncio.run(agent.process_query(prompt))
+            result = asyncio.run_coroutine_threadsafe(
+                agent.process_query(prompt), loop
+            ).result()
 
             ai_response = result.get(
                 "response",
@@ -82,4 +135,6 @@ def ui():
                     st.markdown(ai_response)
 
                     if tool_results := result.get("tool_results"):
-                        display_tool_results(tool_results)
+                        display_tool_results(
+                            tool_results, key=len(st.session_state.messages) - 1
+                        )
@@ -9,8 +9,14 @@ views/tables:
 
 import os
 import asyncio
+import inspect
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, fields
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import wraps
+from itertools import starmap
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from dotenv import load_dotenv
 import oracledb
@@ -19,109 +25,273 @@ from fastmcp import FastMCP
 
 app = FastMCP("oci-db-doctor")
 
+# Return CLOB/BLOB columns as str/bytes directly rather than as LOB locators
+# that need additional round trips to read.
+oracledb.defaults.fetch_lobs = False
+
+load_dotenv()
+
+DB_URL = os.getenv("DB_URL")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+# Rows shipped per network round trip; Oracle's driver default of 100 makes
+# larger result sets pay for many more round trips than necessary.
+DB_ARRAYSIZE = int(os.getenv("DB_ARRAYSIZE", 1000))
+
+# Bounds of the session pool shared by concurrent tool calls
+POOL_MIN = 2
+POOL_MAX = 10
+
+# Rows listed by each tool unless verbose output is requested; the totals always
+# cover all rows.
+SUMMARY_ROWS = 5
+
+# Seconds for which tool results are reused, absorbing repeated tool calls
+# by the agent.  The diagnostics are only meaningful to about a second anyway.
+RESULT_TTL = 5
+
+# Size of the per-session statement cache.  The diagnostic queries are kept as
+# module constants so that every call sends identical SQL text and is served
+# from the cache without re-parsing.
+STATEMENT_CACHE_SIZE = 40
+
+BLOCKING_SESSIONS_SQL = """
+SELECT
+    s.sid,
+    s.serial# AS serial,
+    s.username,
+    s.program,
+    s.machine,
+    s.sql_id,
+    s.event,
+    s.wait_class,
+    s.seconds_in_wait,
+    s.blocking_session,
+    s.final_blocking_session
+FROM
+    gv$session s
+WHERE
+    s.wait_class != 'Idle'
+    AND (s.blocking_session IS NOT NULL OR s.final_blocking_session IS NOT NULL)
+ORDER BY
+    s.seconds_in_wait DESC
+"""
+
+LONG_OPERATIONS_SQL = """
+SELECT
+    sid,
+    opname,
+    target,
+    sofar,
+    totalwork,
+    elapsed_seconds,
+    sql_id,
+    ROUND(sofar / totalwork * 100, 1) AS "progress_percent"
+FROM
+    v$session_longops
+WHERE
+    totalwork > 0
+    AND sofar < totalwork
+ORDER BY
+    elapsed_seconds DESC
+"""
+
+
+@dataclass(slots=True)
+class BlockingSession:
+    """A row of `BLOCKING_SESSIONS_SQL`, fields in the order of its columns"""
+
+    sid: int
+    serial: int
+    username: Optional[str]
+    program: Optional[str]
+    machine: Optional[str]
+    sql_id: Optional[str]
+    event: Optional[str]
+    wait_class: Optional[str]
+    seconds_in_wait: int
+    blocking_session: Optional[int]
+    final_blocking_session: Optional[int]
+
+
+@dataclass(slots=True)
+class LongOperation:
+    """A row of `LONG_OPERATIONS_SQL`, fields in the order of its columns"""
+
+    sid: int
+    opname: Optional[str]
+    target: Optional[str]
+    sofar: int
+    totalwork: int
+    elapsed_seconds: int
+    sql_id: Optional[str]
+    progress_percent: float
+
 
 class DBConnection:
     def __init__(self):
-        load_dotenv()
-        self.db_connection = None
-
-    async def _get_db_connection(self) -> oracledb.Connection:
-        if self.db_connection is None or self.db_connection.is_healthy() is False:
-            dsn = os.getenv("DB_URL")
-            username = os.getenv("DB_USER")
-            password = os.getenv("DB_PASSWORD")
+        self.pool = None
+        # Pairs of SQL text and row class whose columns and fields have been
+        # checked to match
+        self._checked_rows: Set[Tuple[str, type]] = set()
 
-            if not all([dsn, username, password]):
+    def _get_pool(self) -> oracledb.AsyncConnectionPool:
+        if self.pool is None:
+            if not all([DB_URL, DB_USER, DB_PASSWORD]):
                 raise ValueError(
                     "Database credentials not provided in environment variables"
                 )
 
-            self.db_connection = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: oracledb.connect(user=username, password=password, dsn=dsn),
+            self.pool = oracledb.create_pool_async(
+                user=DB_USER,
+                password=DB_PASSWORD,
+                dsn=DB_URL,
+                min=POOL_MIN,
+                max=POOL_MAX,
+                increment=1,
+                getmode=oracledb.POOL_GETMODE_WAIT,
+                stmtcachesize=STATEMENT_CACHE_SIZE,
             )
 
-        return self.db_connection
+        return self.pool
 
     async def _execute_query(
-        self, query: str, params: Optional[Dict] = None
-    ) -> List[Dict]:
-        """Execute a query and return results as list of dicts"""
-        conn = await self._get_db_connection()
+        self,
+        query: str,
+        row_cls: type,
+        params: Optional[Dict] = None,
+    ) -> List:
+        """Execute a query and return results as list of `row_cls`
 
-        def _execute():
+        `row_cls` is called with the columns of each row as arguments, hence
+        its fields have to match the columns of the query in name and order.
+        """
+        pool = self._get_pool()
+
+        async with pool.acquire() as conn:
             with conn.cursor() as cursor:
-                cursor.execute(query, params or {})
-                columns = [col[0] for col in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                cursor.arraysize = DB_ARRAYSIZE
+                # One more than the array size lets single-batch results
+                # complete without an extra round trip to detect the end.
+                cursor.prefetchrows = DB_ARRAYSIZE + 1
+                await cursor.execute(query, params or {})
+                if (query, row_cls) not in self._checked_rows:
+                    columns = tuple(col[0].lower() for col in cursor.description)
+                    if columns != tuple(f.name for f in fields(row_cls)):
+                        raise ValueError(
+                            f"Columns {columns} do not match {row_cls.__name__}"
+                        )
+                    self._checked_rows.add((query, row_cls))
 
-        return await asyncio.get_event_loop().run_in_executor(None, _execute)
+                # Convert whole batches with starmap() rather than awaiting the
+                # cursor once per row.
+                results = []
+                while batch := await cursor.fetchmany():
+                    results.extend(starmap(row_cls, batch))
+                return results
 
 
 connection = DBConnection()
 
 
-@app.tool()
-async def check_blocking_sessions() -> Dict[str, Any]:
-    query = """
-    SELECT
-        s.sid,
-        s.serial#,
-        s.username,
-        s.program,
-        s.machine,
-        s.sql_id,
-        s.event,
-        s.wait_class,
-        s.seconds_in_wait,
-        s.blocking_session,
-        s.final_blocking_session
-    FROM
-        gv$session s
-    WHERE
-        s.wait_class != 'Idle'
-        AND (s.blocking_session IS NOT NULL OR s.final_blocking_session IS NOT NULL)
-    ORDER BY
-        s.seconds_in_wait DESC
+def _ttl_cache(func):
+    """Reuse results of `func` for the same arguments for `RESULT_TTL` seconds
+
+    Concurrent calls with the same arguments wait for the first one to finish
+    rather than all querying the database.
+    """
+    signature = inspect.signature(func)
+    results: Dict[tuple, Tuple[float, Any]] = {}
+    locks: Dict[tuple, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Normalize positional, keyword and default arguments into one key
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = tuple(bound.arguments.items())
+        async with locks[key]:
+            if key in results:
+                timestamp, result = results[key]
+                if time.monotonic() - timestamp < RESULT_TTL:
+                    return result
+            result = await func(*args, **kwargs)
+            results[key] = (time.monotonic(), result)
+            return result
+
+    return wrapper
+
+
+@_ttl_cache
+async def _fetch_rows(query: str, row_cls: type) -> Tuple[str, List]:
+    """Run a diagnostic query, returning the time it was taken and its rows
+
+    The rows are cached rather than the tool results, so that the summary and
+    the verbose output of a tool within `RESULT_TTL` describe the same rows.
     """
+    timestamp = datetime.now().isoformat()
+    return timestamp, await connection._execute_query(query, row_cls)
+
 
-    results = await connection._execute_query(query)
+async def _blocking_sessions(verbose: bool = False) -> Dict[str, Any]:
+    timestamp, results = await _fetch_rows(BLOCKING_SESSIONS_SQL, BlockingSession)
 
     return {
-        "timestamp": datetime.now().isoformat(),
-        "blocking_sessions": results,
+        "timestamp": timestamp,
+        "blocking_sessions": [
+            asdict(row) for row in (results if verbose else results[:SUMMARY_ROWS])
+        ],
         "total_blocked": len(results),
+        "final_blocking_sessions": sorted(
+            {
+                row.final_blocking_session
+                for row in results
+                if row.final_blocking_session is not None
+            }
+        ),
+        "max_seconds_in_wait": max((row.seconds_in_wait for row in results), default=0),
+    }
+
+
+async def _long_operations(verbose: bool = False) -> Dict[str, Any]:
+    timestamp, results = await _fetch_rows(LONG_OPERATIONS_SQL, LongOperation)
+
+    return {
+        "timestamp": timestamp,
+        "operations": [
+            asdict(row) for row in (results if verbose else results[:SUMMARY_ROWS])
+        ],
+        "total_count": len(results),
     }
 
 
 @app.tool()
-async def long_operations() -> Dict[str, Any]:
-    """Track long operations via v$session_longops"""
-    query = """
-    SELECT
-        sid,
-        opname,
-        target,
-        sofar,
-        totalwork,
-        elapsed_seconds,
-        sql_id
-    FROM
-        v$session_longops
-    WHERE
-        totalwork > 0
-        AND sofar < totalwork
-    ORDER BY
-        elapsed_seconds DESC
+async def check_blocking_sessions(verbose: bool = False) -> Dict[str, Any]:
+    """Find sessions blocked by other sessions via gv$session
+
+    Only the longest waiting sessions are listed unless `verbose` is set.
+    """
+    return await _blocking_sessions(verbose)
+
+
+@app.tool()
+async def long_operations(verbose: bool = False) -> Dict[str, Any]:
+    """Track long operations via v$session_longops
+
+    Only the longest running operations are listed unless `verbose` is set.
     """
+    return await _long_operations(verbose)
 
-    results = await connection._execute_query(query)
 
-    for row in results:
-        if row["TOTALWORK"] and row["TOTALWORK"] > 0:
-            row["progress_percent"] = round((row["SOFAR"] / row["TOTALWORK"]) * 100, 1)
+@app.tool()
+async def run_all_diagnostics(verbose: bool = False) -> Dict[str, Any]:
+    """Run all diagnostics concurrently and return their results by tool name"""
+    blocking, operations = await asyncio.gather(
+        _blocking_sessions(verbose), _long_operations(verbose)
+    )
 
-    return {"operations": results, "total_count": len(results)}
+    return {"check_blocking_sessions": blocking, "long_operations": operations}
 
 
 if __name__ == "__main__":